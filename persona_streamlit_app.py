@@ -1,133 +1,110 @@
-
 import streamlit as st
 import praw
+import prawcore
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
-from jinja2 import Template
+from openai import AsyncOpenAI
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from diskcache import Cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import hashlib
+import httpx
+from itertools import zip_longest
+import json
+import queue
 import re
+import threading
+import time
+import uuid
+import requests
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Reddit and OpenAI clients
-reddit = praw.Reddit(
-    client_id=st.secrets["REDDIT_CLIENT_ID"],
-    client_secret=st.secrets["REDDIT_CLIENT_SECRET"],
-    username=st.secrets["REDDIT_USERNAME"],
-    password=st.secrets["REDDIT_PASSWORD"],
-    user_agent=st.secrets["REDDIT_USER_AGENT"]
-)
+# PRAW isn't thread-safe, so callers borrow a client from a shared pool and
+# no two threads ever use the same instance at once
+REDDIT_POOL_SIZE = 4
 
-# Initialize OpenAI via OpenRouter
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=st.secrets["OPENROUTER_API_KEY"]
-)
+@st.cache_resource
+def get_reddit_pool():
+    pool = queue.Queue()
+    for _ in range(REDDIT_POOL_SIZE):
+        pool.put(praw.Reddit(
+            client_id=st.secrets["REDDIT_CLIENT_ID"],
+            client_secret=st.secrets["REDDIT_CLIENT_SECRET"],
+            username=st.secrets["REDDIT_USERNAME"],
+            password=st.secrets["REDDIT_PASSWORD"],
+            user_agent=st.secrets["REDDIT_USER_AGENT"],
+            requestor_kwargs={"session": requests.Session()}
+        ))
+    return pool
 
-def query_llm(prompt):
+@contextmanager
+def borrow_reddit(pool):
+    reddit = pool.get()
     try:
-        completion = client.chat.completions.create(
-            model="mistralai/mistral-7b-instruct",
-            extra_headers={
-                "HTTP-Referer": "https://github.com/your-repo",
-                "X-Title": "PersonaFinderApp"
-            },
-            messages=[
-                {"role": "system", "content": "You are an expert persona analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2048,
-            temperature=0.7
-        )
-        return completion.choices[0].message.content.strip()
-    except Exception as e:
-        return f"[Error querying LLM: {str(e)}]"
-
-def parse_llm_response(response_text):
-    def extract_section(header):
-        pattern = rf"\*\*{re.escape(header)}:\*\*\s*(.*?)(?=\n\*\*|$)"
-        match = re.search(pattern, response_text, re.DOTALL)
-        return match.group(1).strip() if match else ""
-
-    def extract_bullet_list(section_text):
-        lines = section_text.splitlines()
-        return [line.strip("•- ").strip() for line in lines if line.strip()]
-
-    def extract_key_value_pairs(section_text):
-        items = []
-        for line in section_text.splitlines():
-            line = line.strip("•- ").strip()
-            if "(" in line and ")" in line:
-                parts = line.rsplit("(", 1)
-                items.append((parts[0].strip(), parts[1].strip(")")))
-            else:
-                items.append((line, ""))
-        return items
-
-    parsed = {}
-
-    parsed["motivations"] = extract_key_value_pairs(extract_section("Motivations"))
-    parsed["frustrations"] = extract_key_value_pairs(extract_section("Frustrations"))
-    parsed["behaviors"] = extract_key_value_pairs(extract_section("Behavioral habits"))
-    parsed["goals"] = extract_bullet_list(extract_section("Goals and needs"))
-    parsed["quote"] = extract_section("Short quote").strip('"')
-
-    # Personality example: "52% Introverted, 25% Intuitive, 90% Feeling, 65% Perceiving"
-    personality_line = extract_section("Personality")
-    parsed["personality_bars"] = generate_personality_bars(personality_line)
-    parsed["age"] = extract_section("Age")
-    parsed["occupation"] = extract_section("Occupation")
-    parsed["status"] = extract_section("Status")
-    parsed["location"] = extract_section("Location")
-    parsed["archetype"] = extract_section("Archetype")
-
-    return parsed
-
-def generate_personality_bars(personality_text):
-    traits = personality_text.split(",")
-    scores = {}
-    for trait in traits:
-        match = re.match(r"(\d+)%\s+(\w+)", trait.strip())
-        if match:
-            percent = int(match.group(1))
-            label = match.group(2).capitalize()
-            scores[label] = percent
+        yield reddit
+    finally:
+        pool.put(reddit)
 
-    def bar(left, right):
-        left_score = scores.get(left.capitalize(), 0)
-        bar_length = 20
-        left_len = round(left_score / 100 * bar_length)
-        right_len = bar_length - left_len
-        return f"{left.upper():<11} [" + "■" * left_len + "-" * right_len + f"] {right.upper()}"
+# One event loop for the whole server, running in a background thread. The
+# shared OpenRouter client's pooled connections live on it, so neither is
+# ever recreated per session or left behind when a session ends
+@st.cache_resource
+def get_event_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return loop
 
-    return [
-        bar("Introverted", "Extroverted"),
-        bar("Intuitive", "Sensing"),
-        bar("Feeling", "Thinking"),
-        bar("Perceiving", "Judging"),
-    ]
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
 
+KEEPALIVE_EXPIRY = 30
 
+@st.cache_resource
+def get_openai():
+    # HTTP/2 with keep-alive lets warm-up and completion share one connection
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=KEEPALIVE_EXPIRY)
+    )
+    return AsyncOpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=st.secrets["OPENROUTER_API_KEY"],
+        http_client=http_client
+    )
 
-def build_persona(username):
-    redditor = reddit.redditor(username)
-    posts = []
-    comments = []
-    try:
-        posts = [sub.title + " " + sub.selftext for sub in redditor.submissions.new(limit=20)]
-        comments = [c.body for c in redditor.comments.new(limit=50)]
-    except Exception as e:
-        print(f"Error accessing user data for {username}: {e}")
-        return
+# Monotonic time of the last OpenRouter request, shared across sessions, used
+# to tell whether the pooled connection is likely still open
+@st.cache_resource
+def get_llm_activity():
+    return {"last_request": 0.0}
 
-    all_text = "\n".join(posts + comments)
-    if not all_text.strip():
-        print(f"No data found for user '{username}'. Cannot build persona.")
-        return
+def llm_connection_cold():
+    return time.monotonic() - get_llm_activity()["last_request"] > KEEPALIVE_EXPIRY
 
+LLM_MODEL = "mistralai/mistral-7b-instruct"
+LLM_TEMPERATURE = 0.7
+# Provisional budget, not yet measured: personas are expected around 600
+# tokens. query_llm logs completion_tokens for each call so this can be set to
+# the measured p95 + 20%, and truncated responses are never cached
+LLM_MAX_TOKENS = 1024
+# Prefer providers that do server-side prefix caching for this model
+OPENROUTER_PROVIDER = {"order": ["Together", "Fireworks"], "allow_fallbacks": True}
+SYSTEM_PROMPT = "You are an expert persona analyst."
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://github.com/your-repo",
+    "X-Title": "PersonaFinderApp"
+}
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
 
-    prompt = f"""
+# The prompt is the baseline one split around the user's text: the task goes
+# first (cache_control breakpoint in build_messages), the response format
+# after the text so the model reads the exact headings last
+PROMPT_PREFIX = """
 Given the following Reddit posts and comments from a user, infer:
 
 - Motivations
@@ -147,7 +124,8 @@ Format the output like this (example values):
 - Generate a short quote that best represents this user (less than 140 characters and just the quote)
 
 Text:
-{all_text}
+"""
+PROMPT_SUFFIX = """
 
 Respond clearly under each heading using bullet points. Use exactly these headings in bold:
 **Motivations:**
@@ -164,37 +142,393 @@ Respond clearly under each heading using bullet points. Use exactly these headin
 
 Each section must be present, even if minimal data exists. Do not skip or rename any heading. Do not include markdown bullets or formatting in the values.
 """
-    llm_response = query_llm(prompt)
+
+class LLMCache:
+    def __init__(self, directory="./.llm_cache", expire=86400):
+        self.cache = Cache(directory)
+        self.expire = expire
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        payload = json.dumps({
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, text, expire=None):
+        self.cache.set(key, text, expire=expire or self.expire)
+
+@st.cache_resource
+def get_llm_cache():
+    return LLMCache()
+
+WARM_UP_DELAY = 0.25
+
+async def warm_llm(client, activity, text_ready):
+    # Only opens the TLS connection while Reddit is paging; nothing is
+    # prefilled since the prompt is too short for prefix caching. Text served
+    # from cache arrives within the delay, and then the warm-up never fires
+    await asyncio.sleep(WARM_UP_DELAY)
+    if text_ready.is_set():
+        return
+    try:
+        await client.chat.completions.create(
+            model=LLM_MODEL,
+            extra_headers=OPENROUTER_HEADERS,
+            extra_body={"provider": OPENROUTER_PROVIDER},
+            messages=[SYSTEM_MESSAGE, {"role": "user", "content": "Hi"}],
+            max_tokens=1
+        )
+        activity["last_request"] = time.monotonic()
+    except Exception as e:
+        print(f"Error warming LLM connection: {e}")
+
+async def stream_completion(client, messages, deltas):
+    # Runs on the background loop; each delta is handed to the script thread
+    # through the queue and None marks the end of the stream. Returns the
+    # finish reason and completion token count
+    try:
+        stream = await client.chat.completions.create(
+            model=LLM_MODEL,
+            extra_headers=OPENROUTER_HEADERS,
+            extra_body={"provider": OPENROUTER_PROVIDER},
+            messages=messages,
+            max_tokens=LLM_MAX_TOKENS,
+            temperature=LLM_TEMPERATURE,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        finish_reason = None
+        completion_tokens = None
+        async for chunk in stream:
+            if chunk.usage:
+                completion_tokens = chunk.usage.completion_tokens
+            if chunk.choices:
+                choice = chunk.choices[0]
+                deltas.put(choice.delta.content or "")
+                finish_reason = choice.finish_reason or finish_reason
+        return finish_reason, completion_tokens
+    finally:
+        deltas.put(None)
+
+def build_messages(all_text):
+    return [
+        SYSTEM_MESSAGE,
+        {"role": "user", "content": [
+            {"type": "text", "text": PROMPT_PREFIX, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": all_text},
+            {"type": "text", "text": PROMPT_SUFFIX}
+        ]}
+    ]
+
+def llm_cache_key(messages):
+    return LLMCache.make_key(LLM_MODEL, messages, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+
+STREAM_UPDATE_INTERVAL = 0.1
+
+def query_llm(all_text, on_delta=None, refresh=False):
+    messages = build_messages(all_text)
+    key = llm_cache_key(messages)
+    # A refresh skips the lookup and overwrites the entry with the new response
+    if not refresh:
+        text = get_llm_cache().get(key)
+        if text is not None:
+            return text
+
+    deltas = queue.Queue()
+    future = run_async(stream_completion(get_openai(), messages, deltas))
+    try:
+        # Hand the text so far to the caller as it arrives, so the UI can show
+        # it instead of waiting for the full completion. Updates are throttled
+        # so each one isn't a full re-join and re-send per token
+        buf = []
+        last_update = time.monotonic()
+        while (delta := deltas.get()) is not None:
+            buf.append(delta)
+            if on_delta and time.monotonic() - last_update >= STREAM_UPDATE_INTERVAL:
+                on_delta("".join(buf))
+                last_update = time.monotonic()
+        finish_reason, completion_tokens = future.result()
+        get_llm_activity()["last_request"] = time.monotonic()
+        print(f"LLM completion: {completion_tokens} tokens, finish_reason={finish_reason}")
+        text = "".join(buf).strip()
+        if not text:
+            print("Error querying LLM: empty completion")
+            return None
+        if finish_reason == "length":
+            # Missing its trailing sections, so show it but don't keep it
+            print(f"LLM completion truncated at max_tokens={LLM_MAX_TOKENS}; not caching it")
+            return text
+        get_llm_cache().set(key, text)
+        return text
+    except Exception as e:
+        # None rather than an error string, so nothing gets rendered or cached
+        print(f"Error querying LLM: {e}")
+        return None
+    finally:
+        future.cancel()
+
+# Patterns are compiled once at import instead of per call
+# Headers only count at the start of a line, matching the old "\n**" sentinel,
+# optionally behind a list or heading marker ("1. **Age:**", "### **Age:**")
+_HEADER_RE = re.compile(r"^[ \t]*(?:[-•*#]+|\d+\.)?[ \t]*\*\*([A-Za-z ]+):\*\*", re.MULTILINE)
+_TRAIT_RE = re.compile(r"(\d+)%\s+(\w+)")
+# One bullet per line, with an optional trailing "(source)" for key/value lists
+_BULLET_RE = re.compile(r"^[ \t•\-]*(.*?)[ \t•\-\r]*$", re.MULTILINE)
+_KEY_VALUE_RE = re.compile(r"^[ \t•\-]*(.+?)(?:[ \t]*\([ \t]*([^()\n]*?)[ \t]*\))?[ \t•\-\r]*$", re.MULTILINE)
+
+def split_sections(response_text):
+    # Single pass over the response: each section runs up to the next header
+    matches = list(_HEADER_RE.finditer(response_text))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response_text)
+        sections.setdefault(match.group(1), response_text[match.end():end].strip())
+    return sections
+
+def parse_llm_response(response_text):
+    sections = split_sections(response_text)
+
+    def extract_bullet_list(section_text):
+        return [m.group(1) for m in _BULLET_RE.finditer(section_text) if m.group(1)]
+
+    def extract_key_value_pairs(section_text):
+        return [
+            (m.group(1).strip(), (m.group(2) or "").strip())
+            for m in _KEY_VALUE_RE.finditer(section_text)
+            if m.group(1).strip()
+        ]
+
+    parsed = {}
+
+    parsed["motivations"] = extract_key_value_pairs(sections.get("Motivations", ""))
+    parsed["frustrations"] = extract_key_value_pairs(sections.get("Frustrations", ""))
+    parsed["behaviors"] = extract_key_value_pairs(sections.get("Behavioral habits", ""))
+    parsed["goals"] = extract_bullet_list(sections.get("Goals and needs", ""))
+    parsed["quote"] = sections.get("Short quote", "").strip('"')
+
+    # Personality example: "52% Introverted, 25% Intuitive, 90% Feeling, 65% Perceiving"
+    personality_line = sections.get("Personality", "")
+    parsed["personality_bars"] = generate_personality_bars(personality_line)
+    parsed["age"] = sections.get("Age", "")
+    parsed["occupation"] = sections.get("Occupation", "")
+    parsed["status"] = sections.get("Status", "")
+    parsed["location"] = sections.get("Location", "")
+    parsed["archetype"] = sections.get("Archetype", "")
+
+    return parsed
+
+# Every possible 20-cell bar, indexed by the number of filled cells
+_BARS = tuple("■" * i + "-" * (20 - i) for i in range(21))
+_MBTI_PAIRS = (
+    ("Introverted", "Extroverted"),
+    ("Intuitive", "Sensing"),
+    ("Feeling", "Thinking"),
+    ("Perceiving", "Judging"),
+)
+
+def generate_personality_bars(personality_text):
+    traits = personality_text.split(",")
+    scores = {}
+    for trait in traits:
+        match = _TRAIT_RE.match(trait.strip())
+        if match:
+            percent = int(match.group(1))
+            label = match.group(2).capitalize()
+            scores[label] = percent
+
+    def bar(left, right):
+        left_score = min(scores.get(left.capitalize(), 0), 100)
+        return f"{left.upper():<11} [{_BARS[(left_score * 20 + 50) // 100]}] {right.upper()}"
+
+    return [bar(left, right) for left, right in _MBTI_PAIRS]
+
+
+
+MAX_PROMPT_CHARS = 6000
+MAX_ITEM_CHARS = 800
+
+def prepare_text(posts, comments, max_chars=MAX_PROMPT_CHARS):
+    # Alternate posts and comments and cap each one, so the prompt budget
+    # isn't spent entirely on whichever list comes first
+    interleaved = [t for pair in zip_longest(posts, comments) for t in pair if t is not None]
+
+    # Drop quoted replies and duplicates, then cap the prompt size
+    seen = set()
+    lines = []
+    total = 0
+    for text in interleaved:
+        text = "\n".join(line for line in text.splitlines() if not line.lstrip().startswith(">")).strip()
+        if not text:
+            continue
+        digest = hashlib.blake2b(text.lower().encode("utf-8"), digest_size=8).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        text = text[:MAX_ITEM_CHARS]
+        lines.append(text)
+        total += len(text) + 1
+        if total >= max_chars:
+            break
+    return "\n".join(lines)[:max_chars]
+
+# Compile the persona template once; bytecode is reused across worker restarts
+@st.cache_resource
+def get_template():
+    os.makedirs(".jinja_cache", exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader("templates"),
+        bytecode_cache=FileSystemBytecodeCache(directory=".jinja_cache"),
+        auto_reload=False
+    )
+    return env.get_template("persona_template.txt")
+
+# Last successfully fetched text per user, served while Reddit rate-limits us
+@st.cache_resource
+def get_reddit_cache():
+    return Cache("./.reddit_cache")
+
+REDDIT_STALE_TTL = 86400
+
+# Shared across sessions so concurrent lookups of one user hit Reddit once
+@st.cache_data(ttl=600, show_spinner=False)
+def _fetch_user_text(username):
+    pool = get_reddit_pool()
+
+    # Materialize each listing in one request; title, selftext and body are
+    # populated from the listing JSON, so reading them never lazy-fetches
+    def _fetch_posts():
+        with borrow_reddit(pool) as reddit:
+            submissions = list(reddit.redditor(username).submissions.new(limit=20))
+        return [sub.title + " " + sub.selftext for sub in submissions]
+
+    def _fetch_comments():
+        with borrow_reddit(pool) as reddit:
+            comments = list(reddit.redditor(username).comments.new(limit=50))
+        return [c.body for c in comments]
+
+    # The two listings are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        posts_future = executor.submit(_fetch_posts)
+        comments_future = executor.submit(_fetch_comments)
+        posts, comments = posts_future.result(), comments_future.result()
+
+    all_text = prepare_text(posts, comments)
+    get_reddit_cache().set(username, all_text, expire=REDDIT_STALE_TTL)
+    return all_text
+
+def get_user_text(username):
+    # Reddit usernames are case-insensitive
+    username = username.lower()
+    try:
+        return _fetch_user_text(username)
+    except prawcore.exceptions.TooManyRequests:
+        # Served outside the cached function so stale text isn't cached as fresh
+        stale = get_reddit_cache().get(username)
+        if stale is None:
+            raise
+        return stale
+
+def write_persona_file(file_path, data):
+    # Write to a temp file and swap it in, so concurrent builds of the same
+    # user never leave a partially written file behind. os.open with 0o666
+    # lets the umask set the final mode, as a plain open() would
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except OSError as e:
+        print(f"Error writing persona file {file_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def render_persona(username, llm_response):
     parsed_data = parse_llm_response(llm_response)
     parsed_data["name"] = username
 
-    with open("templates/persona_template.txt", "r", encoding="utf-8") as f:
-        template = Template(f.read())
-
-    rendered = template.render(**parsed_data)
+    rendered = get_template().render(**parsed_data)
     file_path = f"personas/{username}_persona.txt"
     os.makedirs("personas", exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(rendered)
+    # The UI serves the download from memory, so the disk copy needn't block it.
+    # Not a daemon thread, so a pending write still finishes on shutdown
+    threading.Thread(target=write_persona_file, args=(file_path, rendered.encode("utf-8"))).start()
 
     return rendered, file_path
 
+# Repeat lookups of the same user within the TTL reuse the last response and
+# skip both Reddit and the LLM
+PERSONA_TTL = 1800
+
+def persona_memo_key(username):
+    # Reddit usernames are case-insensitive
+    return f"persona:{username.lower()}"
+
+def build_persona(username, on_delta=None, refresh=False):
+    if refresh:
+        _fetch_user_text.clear()
+    else:
+        llm_response = get_llm_cache().get(persona_memo_key(username))
+        if llm_response is not None:
+            return render_persona(username, llm_response)
+
+    # Warm up only when the shared connection has likely expired and the LLM
+    # will probably be called, i.e. the user's last known text has no cached
+    # response. The real request never waits on the warm-up
+    text_ready = threading.Event()
+    if llm_connection_cold():
+        previous_text = get_reddit_cache().get(username.lower())
+        if refresh or previous_text is None or get_llm_cache().get(llm_cache_key(build_messages(previous_text))) is None:
+            run_async(warm_llm(get_openai(), get_llm_activity(), text_ready))
+    try:
+        all_text = get_user_text(username)
+    except Exception as e:
+        print(f"Error accessing user data for {username}: {e}")
+        return
+    finally:
+        text_ready.set()
+
+    if not all_text.strip():
+        print(f"No data found for user '{username}'. Cannot build persona.")
+        return
+
+
+    llm_response = query_llm(all_text, on_delta, refresh)
+    if llm_response is None:
+        return
+    # Only memoize responses the LLM cache accepted, so truncated ones aren't reused
+    if get_llm_cache().get(llm_cache_key(build_messages(all_text))) is not None:
+        get_llm_cache().set(persona_memo_key(username), llm_response, expire=PERSONA_TTL)
+    return render_persona(username, llm_response)
+
 # === Streamlit UI ===
 st.title("🧠 Persona Finder")
 st.write("Analyze any Reddit user's behavior using AI!")
 
 profile_url = st.text_input("Enter Reddit profile URL (e.g. https://www.reddit.com/user/kojied/)")
 
-if st.button("🧬 Find Persona"):
+find_clicked = st.button("🧬 Find Persona")
+refresh_clicked = st.button("🔄 Refresh")
+
+if find_clicked or refresh_clicked:
     if not profile_url.startswith("https://www.reddit.com/user/"):
         st.error("Invalid URL. Please enter a valid Reddit user profile link.")
     else:
         username = profile_url.rstrip("/").split("/user/")[-1].split("/")[0]
-        result_text, filepath = build_persona(username)
+        placeholder = st.empty()
+        result = build_persona(username, on_delta=placeholder.markdown, refresh=refresh_clicked)
+        placeholder.empty()
+        result_text, filepath = result or (None, None)
         if result_text:
             st.success("Persona generated!")
             st.text_area("Persona Report", result_text, height=600)
-            with open(filepath, "rb") as f:
-                st.download_button(label="📄 Download Persona File", data=f, file_name=os.path.basename(filepath))
+            st.download_button(label="📄 Download Persona File", data=result_text.encode("utf-8"), file_name=os.path.basename(filepath))
         else:
             st.error("Failed to generate persona.")